@@ -1,5 +1,20 @@
 from . import exceptions
 from enum import Enum, auto
+from functools import wraps, lru_cache
+from dateutil import parser
+from datetime import datetime
+import re
+try:
+    import re2
+except ImportError:
+    re2 = None
+try:
+    from ciso8601 import parse_datetime as _parseIsoDatetime
+except ImportError:
+    _parseIsoDatetime = datetime.fromisoformat
+
+# Plain ISO 8601 timestamps that the fast parsers and dateutil read the same way
+_isoDatetimeRegex = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ](?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d{1,6})?)?(?:Z|[+-](?:[01]\d|2[0-3]):[0-5]\d)?)?", re.ASCII)
 
 
 class FieldException(exceptions.PrintableException):
@@ -8,17 +23,14 @@ class FieldException(exceptions.PrintableException):
         super().__init__(message=message, **kwargs)
 
 
-def clean(field):
+def clean(field, keepMetadata=False):
     # TODO Add docs
 
-    from functools import wraps
-
     if not isinstance(field, Field):
         raise TypeError("Expected Field")
 
     def decorator(func):
 
-        @wraps(func)
         def wrappedFunc(data):
 
             try:
@@ -27,11 +39,35 @@ def clean(field):
             except FieldException as e:
                 raise exceptions.BadRequestException(message="Request data validation error") from e
 
+        if keepMetadata:
+            wrappedFunc = wraps(func)(wrappedFunc)
         return wrappedFunc
 
     return decorator
 
 
+_SKIP = object()
+
+# Match StringField regexes with RE2 (requires google-re2)
+# Note: RE2 runs in linear time but \d, \w, \s and \b only match ASCII characters
+useRe2 = False
+
+if re2 is not None:
+    _re2Options = re2.Options()
+    _re2Options.log_errors = False
+
+
+@lru_cache(maxsize=256)
+def _compileRegex(regex, re2Enabled):
+    # Fall back to re for syntax RE2 does not support
+    if re2Enabled and re2 is not None and isinstance(regex, str):
+        try:
+            return re2.compile(regex, _re2Options)
+        except re2.error:
+            pass
+    return re.compile(regex)
+
+
 class Do(Enum):
     # TODO Add docs
     SKIP = auto(),
@@ -41,6 +77,8 @@ class Do(Enum):
 class Default:
     # TODO Add docs
 
+    __slots__ = ("_value",)
+
     def __init__(self, value):
         self._value = value
 
@@ -52,6 +90,8 @@ class Default:
 class Field:
     # TODO Add docs
 
+    __slots__ = ("_missing", "_error")
+
     def __init__(self, missing=Do.RAISE, error=Do.RAISE):
         # TODO Add docs
         if not isinstance(missing, (Do, Default)):
@@ -73,52 +113,73 @@ class Field:
         # TODO Add docs
         raise NotImplementedError()
 
-    def cleanAndAdd(self, present, value, add):
+    def cleanAndGet(self, present, value):
         # TODO Add docs
         if present:
             try:
-                value = self.clean(value)
+                return self.clean(value)
             except FieldException as e:
-                if self._error == Do.RAISE:
+                if self._error is Do.RAISE:
                     raise e
                 elif isinstance(self._error, Default):
-                    add(self._error.value)
-            else:
-                add(value)
+                    return self._error.value
         else:
-            if self._missing == Do.RAISE:
+            if self._missing is Do.RAISE:
                 raise FieldException("Required but missing")
             elif isinstance(self._missing, Default):
-                add(self._missing.value)
+                return self._missing.value
+        return _SKIP
+
+    def cleanAndAdd(self, present, value, add):
+        # TODO Add docs
+        value = self.cleanAndGet(present, value)
+        if value is not _SKIP:
+            add(value)
 
 
 class TypeField(Field):
     # TODO Add docs
 
+    __slots__ = ("_type", "_typeTuple", "_typeSet", "_typeName")
+
     def __init__(self, type, **kwargs):
         # TODO Add docs
         super().__init__(**kwargs)
         self._type = type
+        self._typeTuple = tuple(type) if isinstance(type, (tuple, list)) else (type,)
+        self._typeSet = frozenset(self._typeTuple)
+        self._typeName = TypeField.formatTypeConstraint(type)
 
     @property
     def type(self):
         return self._type
 
     def clean(self, value):
-        if not isinstance(value, self._type):
-            types = self._type if isinstance(self._type, (tuple, list)) else [self._type]
-            raise FieldException(f"Expected type {' or '.join(map(lambda t: t.__name__, types))}", expectedTypes=self._type, foundType=type(value))
+        if type(value) not in self._typeSet and not isinstance(value, self._typeTuple):
+            raise FieldException(f"Expected type {self._typeName}", expectedTypes=self._type, foundType=type(value))
+        return self._cleanNoTypeCheck(value)
+
+    def _cleanNoTypeCheck(self, value):
         return value
 
+    @staticmethod
+    def formatTypeConstraint(type):
+        types = type if isinstance(type, (tuple, list)) else [type]
+        return ' or '.join(map(lambda t: t.__name__, types))
+
 
 class ScalarField(TypeField):
     # TODO Add docs
 
+    __slots__ = ("_min", "_max", "_minMessage", "_maxMessage")
+
     def __init__(self, type, min=None, max=None, **kwargs):
         # TODO Add docs
         super().__init__(type, **kwargs)
         self._min = min
         self._max = max
+        self._minMessage = f"Value must be >= {min}"
+        self._maxMessage = f"Value must be <= {max}"
 
     @property
     def min(self):
@@ -128,18 +189,19 @@ class ScalarField(TypeField):
     def max(self):
         return self._max
 
-    def clean(self, value):
-        value = super().clean(value)
+    def _cleanNoTypeCheck(self, value):
         if self._min is not None and value < self._min:
-            raise FieldException(f"Value must be >= {self._min}", minValue=self._min, foundValue=value)
+            raise FieldException(self._minMessage, minValue=self._min, foundValue=value)
         if self._max is not None and value > self._max:
-            raise FieldException(f"Value must be <= {self._max}", maxValue=self._max, foundValue=value)
+            raise FieldException(self._maxMessage, maxValue=self._max, foundValue=value)
         return value
 
 
 class IntField(ScalarField):
     # TODO Add docs
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(int, **kwargs)
 
@@ -147,6 +209,8 @@ class IntField(ScalarField):
 class FloatField(ScalarField):
     # TODO Add docs
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__((int, float), **kwargs)
 
@@ -154,6 +218,8 @@ class FloatField(ScalarField):
 class BoolField(TypeField):
     # TODO Add docs
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(bool, **kwargs)
 
@@ -161,12 +227,18 @@ class BoolField(TypeField):
 class StringField(TypeField):
     # TODO Add docs
 
+    __slots__ = ("_minLength", "_maxLength", "_minLengthMessage", "_maxLengthMessage", "_regex", "_regexSource", "_regexMatch", "_regexMessage")
+
     def __init__(self, minLength=None, maxLength=None, regex=None, **kwargs):
         super().__init__(str, **kwargs)
         self._minLength = minLength
         self._maxLength = maxLength
-        import re
-        self._regex = re.compile(regex) if regex is not None else None
+        self._minLengthMessage = f'String must be at least {minLength} characters long'
+        self._maxLengthMessage = f'String cannot be longer than {maxLength} characters'
+        self._regex = _compileRegex(regex, useRe2) if regex is not None else None
+        self._regexSource = self._regex.pattern if regex is not None else None
+        self._regexMatch = self._regex.fullmatch if regex is not None else None
+        self._regexMessage = f'String does not match regex "{self._regexSource}"'
 
     @property
     def minLength(self):
@@ -180,26 +252,39 @@ class StringField(TypeField):
     def regex(self):
         return self._regex
 
-    def clean(self, value):
-        value = super().clean(value)
+    def _cleanNoTypeCheck(self, value):
         if self._minLength is not None and len(value) < self._minLength:
-            raise FieldException(f'String must be at least {self._minLength} characters long', minLength=self._minLength, foundLength=len(value))
+            raise FieldException(self._minLengthMessage, minLength=self._minLength, foundLength=len(value))
         if self._maxLength is not None and len(value) > self._maxLength:
-            raise FieldException(f'String cannot be longer than {self._maxLength} characters', maxLength=self._maxLength, foundLength=len(value))
-        if self._regex is not None and not self._regex.fullmatch(value):
-            raise FieldException(f'String does not match regex "{self._regex.pattern}"', regex=self._regex.pattern)
+            raise FieldException(self._maxLengthMessage, maxLength=self._maxLength, foundLength=len(value))
+        if self._regexMatch is not None and not self._regexMatch(value):
+            raise FieldException(self._regexMessage, regex=self._regexSource)
         return value
 
 
 class ListField(TypeField):
     # TODO Add docs
 
+    __slots__ = ("_minLength", "_maxLength", "_fields", "_minLengthMessage", "_maxLengthMessage", "_itemField", "_itemFields", "_itemFieldsCanSkip")
+
     def __init__(self, minLength=None, maxLength=None, fields=None, **kwargs):
         # TODO Add docs
         super().__init__(list, **kwargs)
         self._minLength = minLength
         self._maxLength = maxLength
         self._fields = fields
+        self._minLengthMessage = f'List length must be >= {minLength}'
+        self._maxLengthMessage = f'List length must be <= {maxLength}'
+        self._itemField = None
+        self._itemFields = None
+        self._itemFieldsCanSkip = False
+        if isinstance(fields, list):
+            self._itemFields = tuple(fields)
+            self._itemFieldsCanSkip = any(f is not None and f._error is Do.SKIP for f in fields)
+        elif isinstance(fields, Field):
+            self._itemField = fields
+        elif fields is not None:
+            raise TypeError("Bad type fields type")
 
     @property
     def minLength(self):
@@ -213,28 +298,64 @@ class ListField(TypeField):
     def fields(self):
         return self._fields
 
-    def clean(self, value):
-        value = super().clean(value)
+    def _cleanNoTypeCheck(self, value):
         if self._minLength is not None and len(value) < self._minLength:
-            raise FieldException(f'List length must be >= {self._minLength}', minLength=self._minLength, foundLength=len(value))
+            raise FieldException(self._minLengthMessage, minLength=self._minLength, foundLength=len(value))
         if self._maxLength is not None and len(value) > self._maxLength:
-            raise FieldException(f'List length must be <= {self._maxLength}', maxLength=self._maxLength, foundLength=len(value))
-        if self._fields is not None:
-            if isinstance(self._fields, list):
-                fields = self._fields
-            elif isinstance(self._fields, Field):
-                fields = [self._fields] * len(value)
+            raise FieldException(self._maxLengthMessage, maxLength=self._maxLength, foundLength=len(value))
+        if self._itemField is not None:
+            field = self._itemField
+            if field._error is Do.RAISE:
+                items = [None] * len(value)
+                clean = field.clean
+                for i, item in enumerate(value):
+                    try:
+                        items[i] = clean(item)
+                    except FieldException as e:
+                        raise FieldException(f"Field exception on item {i}", index=i) from e
             else:
-                raise TypeError("Bad type fields type")
-            items = []
-            for i, item in enumerate(value):
-                if fields[i] is not None:
+                items = []
+                append = items.append
+                for i, item in enumerate(value):
+                    try:
+                        item = field.cleanAndGet(True, item)
+                    except FieldException as e:
+                        raise FieldException(f"Field exception on item {i}", index=i) from e
+                    if item is not _SKIP:
+                        append(item)
+            value = items
+        elif self._itemFields is not None:
+            fields = self._itemFields
+            if self._itemFieldsCanSkip:
+                items = []
+                append = items.append
+                for i, item in enumerate(value):
+                    field = fields[i]
+                    if field is None:
+                        append(item)
+                        continue
                     try:
-                        fields[i].cleanAndAdd(True, item, items.append)
+                        if field._error is Do.RAISE:
+                            item = field.clean(item)
+                        else:
+                            item = field.cleanAndGet(True, item)
                     except FieldException as e:
                         raise FieldException(f"Field exception on item {i}", index=i) from e
-                else:
-                    items.append(item)
+                    if item is not _SKIP:
+                        append(item)
+            else:
+                items = [None] * len(value)
+                for i, item in enumerate(value):
+                    field = fields[i]
+                    if field is not None:
+                        try:
+                            if field._error is Do.RAISE:
+                                item = field.clean(item)
+                            else:
+                                item = field.cleanAndGet(True, item)
+                        except FieldException as e:
+                            raise FieldException(f"Field exception on item {i}", index=i) from e
+                    items[i] = item
             value = items
         return value
 
@@ -250,12 +371,16 @@ class ListField(TypeField):
 class TimeField(TypeField):
     # TODO Add docs
 
+    __slots__ = ("_min", "_max", "_tzAware", "_minMessage", "_maxMessage")
+
     def __init__(self, min=None, max=None, tzAware=None, **kwargs):
         # TODO Add docs
         super().__init__(str, **kwargs)
         self._min = min
         self._max = max
         self._tzAware = tzAware
+        self._minMessage = f"Value must be >= {min}"
+        self._maxMessage = f"Value must be <= {max}"
 
     @property
     def min(self):
@@ -271,16 +396,23 @@ class TimeField(TypeField):
 
     def clean(self, value):
         try:
-            from dateutil import parser
-            value = parser.parse(value)
+            # Use the fast parser for plain ISO 8601 timestamps and dateutil for everything else
+            if _isoDatetimeRegex.fullmatch(value):
+                try:
+                    value = _parseIsoDatetime(value)
+                except ValueError:
+                    # Let dateutil report the error
+                    value = parser.parse(value)
+            else:
+                value = parser.parse(value)
         except ValueError as e:
             raise FieldException(f"Invalid datetime: {e}")
         except OverflowError as e:
             raise FieldException("Overflow error")
         if self._min is not None and value < self._min:
-            raise FieldException(f"Value must be >= {self._min}", minValue=self._min)
+            raise FieldException(self._minMessage, minValue=self._min)
         if self._max is not None and value > self._max:
-            raise FieldException(f"Value must be <= {self._max}", maxValue=self._max)
+            raise FieldException(self._maxMessage, maxValue=self._max)
         if self._tzAware is not None:
             if self._tzAware != (value.tzinfo is not None and value.tzinfo.utcoffset(value) is not None):
                 raise FieldException(f"Value must {'' if self._tzAware else 'not '}be timezone aware", expectedTimezoneAware=self._tzAware)
@@ -290,41 +422,58 @@ class TimeField(TypeField):
 class DictField(TypeField):
     # TODO Add docs
 
+    __slots__ = ("_fields", "_itemField", "_fieldsItems", "_fieldsKeySet")
+
     def __init__(self, fields=None, **kwargs):
         # TODO Add docs
         super().__init__(dict, **kwargs)
         self._fields = fields
+        self._itemField = None
+        self._fieldsItems = None
+        self._fieldsKeySet = None
+        if isinstance(fields, Field):
+            self._itemField = fields
+        elif isinstance(fields, dict):
+            self._fieldsItems = tuple(fields.items())
+            self._fieldsKeySet = frozenset(fields.keys())
+        elif fields is not None:
+            raise TypeError("Bad fields type")
 
     @property
     def fields(self):
         return self._fields
 
-    def clean(self, value):
-        value = super().clean(value)
-        if self._fields is not None:
+    def _cleanNoTypeCheck(self, value):
+        if self._itemField is not None:
+            field = self._itemField
             dictionary = {}
-            if isinstance(self._fields, Field):
-                for key, item in value.items():
-                    try:
-                        def add(v):
-                            dictionary[key] = v
-                        self._fields.cleanAndAdd(True, item, add)
-                    except FieldException as e:
-                        raise FieldException(f'Field exception on item "{key}"', key=key) from e
-            elif isinstance(self._fields, dict):
-                for key, item in self._fields.items():
-                    try:
-                        def add(v):
-                            dictionary[key] = v
-                        present = key in value
-                        self._fields[key].cleanAndAdd(present, value[key] if present else None, add)
-                    except FieldException as e:
-                        raise FieldException(f'Field exception on item "{key}"', key=key) from e
-                unexpected = set(value.keys()) - set(self._fields.keys())
-                if len(unexpected) > 0:
-                    raise FieldException(f'Unexpected fields {unexpected}', keys=unexpected)
-            else:
-                raise TypeError("Bad fields type")
+            for key, item in value.items():
+                try:
+                    if field._error is Do.RAISE:
+                        item = field.clean(item)
+                    else:
+                        item = field.cleanAndGet(True, item)
+                except FieldException as e:
+                    raise FieldException(f'Field exception on item "{key}"', key=key) from e
+                if item is not _SKIP:
+                    dictionary[key] = item
+            value = dictionary
+        elif self._fieldsItems is not None:
+            dictionary = {}
+            for key, field in self._fieldsItems:
+                try:
+                    present = key in value
+                    if present and field._error is Do.RAISE:
+                        item = field.clean(value[key])
+                    else:
+                        item = field.cleanAndGet(present, value[key] if present else None)
+                except FieldException as e:
+                    raise FieldException(f'Field exception on item "{key}"', key=key) from e
+                if item is not _SKIP:
+                    dictionary[key] = item
+            if not value.keys() <= self._fieldsKeySet:
+                unexpected = value.keys() - self._fieldsKeySet
+                raise FieldException(f'Unexpected fields {unexpected}', keys=unexpected)
             value = dictionary
         return value
 
@@ -332,6 +481,8 @@ class DictField(TypeField):
 class OptionField(Field):
     # TODO Add docs
 
+    __slots__ = ("_field", "_options")
+
     def __init__(self, field, options, **kwargs):
         # TODO Add docs
         super().__init__(**kwargs)
@@ -1,8 +1,19 @@
-import zlib
 import brotli
-import gzip
+try:
+    from isal import igzip as gzip, isal_zlib as zlib
+except ImportError:
+    try:
+        from zlib_ng import gzip_ng as gzip, zlib_ng as zlib
+    except ImportError:
+        import gzip
+        import zlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from datetime import datetime
 import json
+import math
 from . import exceptions
 
 
@@ -64,7 +75,45 @@ class _JSONEncoder(json.JSONEncoder):
                 raise JsonEncodeException(obj) from e
 
 
+_plainJsonTypes = frozenset((str, int, bool, type(None)))
+
+
+def _isPlainJson(obj):
+    # Whether obj only contains types that orjson and json serialize to equivalent JSON
+    # (the text may differ in whitespace, float exponent format and escaping of control characters)
+    t = type(obj)
+    if t in _plainJsonTypes:
+        return True
+    if t is float:
+        return math.isfinite(obj)
+    if t is list or t is tuple:
+        for item in obj:
+            if not _isPlainJson(item):
+                return False
+        return True
+    if t is dict:
+        for key, item in obj.items():
+            if type(key) is not str or not _isPlainJson(item):
+                return False
+        return True
+    return False
+
+
 def toJsonString(obj, indent=None, ensureAscii=True):
+    if orjson is not None and indent in (None, 2):
+        try:
+            plain = _isPlainJson(obj)
+        except RecursionError:
+            plain = False
+        if plain:
+            # Fall back to json on any orjson failure (e.g. integers beyond 64 bits)
+            try:
+                js = orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+            except orjson.JSONEncodeError:
+                pass
+            else:
+                if not ensureAscii or js.isascii():
+                    return js.decode("utf-8")
     return json.dumps(obj, cls=_JSONEncoder, indent=indent, ensure_ascii=ensureAscii)
 
 
@@ -125,15 +174,19 @@ class UnknownEncodingTypeException(DataEncodingException):
         super().__init__(encoding=encoding, message=f"Unknown encoding type '{encoding}'", **kwargs)
 
 
+def _identity(data):
+    return data
+
+
 _dataEncoders = {
-    "identity": lambda x: x,
+    "identity": _identity,
     "gzip": gzip.compress,
     "deflate": zlib.compress,
     "br": brotli.compress
 }
 
 _dataDecoders = {
-    "identity": lambda x: x,
+    "identity": _identity,
     "gzip": gzip.decompress,
     "deflate": zlib.decompress,
     "br": brotli.decompress
@@ -145,8 +198,12 @@ def _dataEncoding(data, encoding, decode):
         raise TypeError("Encoding type must be str")
     if not isinstance(data, bytes):
         raise TypeError("Data must be bytes")
+    if encoding == "identity":
+        return data
     encoders = _dataDecoders if decode else _dataEncoders
-    encoder = encoders.get(encoding.strip().lower(), None)
+    encoder = encoders.get(encoding, None)
+    if encoder is None:
+        encoder = encoders.get(encoding.strip().lower(), None)
     if encoder is None:
         raise UnknownEncodingTypeException(encoding)
     try:
@@ -191,16 +248,29 @@ class NoEncodingSupportedException(DataEncodingException):
 
 def tryEncode(data, suppCharsets=["utf-8"], suppEncodings=["identity"]):
     ok = False
-    for charset in suppCharsets:
+    # Fast path for UTF-8
+    if len(suppCharsets) > 0 and suppCharsets[0] == "utf-8" and isinstance(data, str):
         try:
-            data = encodeString(data, charset)
-        except StringEncodingException:
-            continue
+            data = data.encode("utf-8")
+        except UnicodeError:
+            pass
         else:
+            charset = "utf-8"
             ok = True
-            break
+    if not ok:
+        for charset in suppCharsets:
+            try:
+                data = encodeString(data, charset)
+            except StringEncodingException:
+                continue
+            else:
+                ok = True
+                break
     if not ok:
         raise NoCharsetSupportedException()
+    # Fast path for identity
+    if len(suppEncodings) > 0 and suppEncodings[0] == "identity":
+        return (data, charset, "identity")
     ok = False
     for encoding in suppEncodings:
         try: